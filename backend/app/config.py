@@ -0,0 +1,25 @@
+"""Application settings shared across routers and services."""
+
+from pathlib import Path
+
+
+class Settings:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+
+    UPLOAD_DIR = BASE_DIR / "uploads"
+    OUTPUT_DIR = BASE_DIR / "outputs"
+    TEMP_DIR = BASE_DIR / "temp"
+    EMBEDDING_DIR = BASE_DIR / "embeddings"
+
+    MAX_FILE_SIZE = 200 * 1024 * 1024  # 200 MB
+    MAX_TEXT_LENGTH = 5000
+
+    # Precision of the speaker-encoder forward pass on GPU; "float32"
+    # disables the autocast fast path.
+    EMBEDDING_PRECISION = "float16"
+
+
+settings = Settings()
+
+for directory in (settings.UPLOAD_DIR, settings.OUTPUT_DIR, settings.TEMP_DIR, settings.EMBEDDING_DIR):
+    directory.mkdir(parents=True, exist_ok=True)
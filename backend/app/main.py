@@ -0,0 +1,27 @@
+"""FastAPI entry point for the text-to-speech backend."""
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from .routers import dubbing, privacy, stt, tts, voice_clone
+
+app = FastAPI(title="Text-to-Speech Backend", version="0.1.0")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(dubbing.router)
+app.include_router(privacy.router)
+app.include_router(stt.router)
+app.include_router(tts.router)
+app.include_router(voice_clone.router)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
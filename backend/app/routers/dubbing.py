@@ -0,0 +1,895 @@
+"""Video dubbing endpoints.
+
+Handles video upload and analysis, TTS generation for the replacement
+audio track, and muxing the result back into the video. Lip-sync via
+Wav2Lip is stubbed out until the model is wired in.
+"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+import filetype
+import orjson
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+
+from ..config import settings
+from ..services import audio_processor, model_manager, video_store
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/dubbing", tags=["dubbing"])
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Heavy inference thrashes caches and torch threads when run
+# concurrently, so it is serialized by default; raise via env to trade
+# per-request latency for throughput on bigger machines.
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "1"))
+LIPSYNC_CONCURRENCY = int(os.getenv("LIPSYNC_CONCURRENCY", "1"))
+
+_TTS_SEM = asyncio.Semaphore(TTS_CONCURRENCY)
+_LIPSYNC_SEM = asyncio.Semaphore(LIPSYNC_CONCURRENCY)
+
+# The PyAV probe and the face detector hold the GIL while they work, so
+# they run in worker processes: linear scaling across cores, and a
+# crash inside the C libraries cannot take the API worker down.
+_cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+# Finished dub audio keyed by input hash; repeat payloads skip both the
+# model call and the speed adjustment. Entries live on disk so restarts
+# keep the cache warm.
+_TTS_CACHE_DIR = settings.TEMP_DIR / "tts_cache"
+_TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+_TTS_CACHE_MAX_ENTRIES = 256
+
+_tts_cache: "OrderedDict[str, Path]" = OrderedDict(
+    (path.stem, path)
+    for path in sorted(_TTS_CACHE_DIR.glob("*.wav"), key=lambda p: p.stat().st_mtime)
+)
+
+
+class VideoUploadResponse(BaseModel):
+    video_id: str
+    filename: str
+    file_size: int
+    duration: float
+    width: int
+    height: int
+    fps: float
+    has_faces: bool
+
+
+class DubbingRequest(BaseModel):
+    video_id: str
+    text: str
+    voice: str = "default"
+    language: str = "en"
+    preserve_original_timing: bool = True
+    lip_sync: bool = False
+
+
+class DubbingResponse(BaseModel):
+    video_id: str
+    output_file: str
+    duration: float
+    message: str
+
+
+@router.post("/upload-video", response_model=VideoUploadResponse)
+async def upload_video(file: UploadFile = File(...)):
+    """Upload a video and register it for dubbing."""
+    # Sniff the magic bytes rather than trusting the client-supplied
+    # Content-Type header; spoofed uploads are rejected before a single
+    # byte hits disk.
+    header = await file.read(4096)
+    kind = filetype.guess(header)
+    if kind is None or not kind.mime.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+
+    video_id = str(uuid.uuid4())
+    upload_path = settings.UPLOAD_DIR / f"{video_id}_{file.filename}"
+
+    # Counting the bytes as they stream past makes the post-write stat
+    # syscall unnecessary, and checking the cap inside the loop aborts
+    # an oversized upload mid-stream instead of writing it out in full
+    # first.
+    file_size = len(header)
+    try:
+        async with aiofiles.open(upload_path, "wb") as f:
+            await f.write(header)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > settings.MAX_FILE_SIZE:
+                    upload_path.unlink(missing_ok=True)
+                    raise HTTPException(status_code=400, detail="File too large")
+                await f.write(chunk)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to save uploaded video: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+
+    # The two probes are independent, so run them concurrently and pay
+    # only the longer of the two latencies.
+    video_info, has_faces = await asyncio.gather(
+        _analyze_video(upload_path),
+        _detect_faces_in_video(upload_path),
+        return_exceptions=True,
+    )
+    if isinstance(video_info, Exception):
+        video_info = {"valid": False, "error": str(video_info)}
+    if isinstance(has_faces, Exception):
+        has_faces = True
+
+    if not video_info.get("valid"):
+        upload_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=video_info.get("error", "Invalid video file"))
+
+    await video_store.put(
+        video_id,
+        {
+            "filename": file.filename,
+            "path": str(upload_path),
+            "file_size": file_size,
+            "info": video_info,
+            "has_faces": has_faces,
+        },
+        ttl=7200,
+    )
+
+    _schedule_unlink(upload_path, delay=7200)
+
+    return VideoUploadResponse(
+        video_id=video_id,
+        filename=file.filename,
+        file_size=file_size,
+        duration=video_info["duration"],
+        width=video_info["width"],
+        height=video_info["height"],
+        fps=video_info["fps"],
+        has_faces=has_faces,
+    )
+
+
+@router.post("/dub", response_model=DubbingResponse)
+async def dub_video(request: DubbingRequest):
+    """Generate TTS audio for the given text and dub it over the video."""
+    video_meta = await video_store.get(request.video_id)
+    if video_meta is None:
+        raise HTTPException(status_code=404, detail="Video not found. Upload it first.")
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="Text must not be empty")
+
+    video_path = Path(video_meta["path"])
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video file has expired")
+
+    tts_audio_path = settings.TEMP_DIR / f"{request.video_id}_dub.wav"
+    output_path = settings.OUTPUT_DIR / f"{request.video_id}_dubbed.mp4"
+
+    try:
+        video_duration = video_meta["info"]["duration"]
+        cache_key = _tts_cache_key(request, video_duration)
+        cached_wav = _tts_cache_get(cache_key)
+
+        if cached_wav is not None:
+            tts_audio_path.unlink(missing_ok=True)
+            os.link(cached_wav, tts_audio_path)  # hardlink, zero-copy
+        else:
+            tts_model = model_manager.get_tts_model()
+            async with _TTS_SEM:
+                await _synthesize_text(tts_model, request, tts_audio_path)
+
+            if request.preserve_original_timing:
+                tts_duration = await audio_processor.get_audio_duration(tts_audio_path)
+                if video_duration > 0 and tts_duration > 0:
+                    speed_factor = tts_duration / video_duration
+                    if abs(speed_factor - 1.0) > 0.05:
+                        await audio_processor.change_speed(tts_audio_path, speed_factor)
+
+            _tts_cache_put(cache_key, tts_audio_path)
+
+        if request.lip_sync and video_meta["has_faces"]:
+            async with _LIPSYNC_SEM:
+                await _apply_wav2lip(video_path, tts_audio_path, output_path)
+        else:
+            await _replace_video_audio(video_path, tts_audio_path, output_path)
+
+        duration = await audio_processor.get_audio_duration(tts_audio_path)
+
+        _schedule_unlink(tts_audio_path, delay=3600)
+        _schedule_unlink(output_path, delay=7200)
+
+        return DubbingResponse(
+            video_id=request.video_id,
+            output_file=f"/api/dubbing/video/{request.video_id}",
+            duration=duration,
+            message="Dubbing completed successfully",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Dubbing failed for {request.video_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Dubbing failed: {e}")
+
+
+@router.post("/extract-audio")
+async def extract_audio_from_video(video_id: str):
+    """Extract the original audio track of an uploaded video."""
+    video_meta = await video_store.get(video_id)
+    if video_meta is None:
+        raise HTTPException(status_code=404, detail="Video not found. Upload it first.")
+
+    video_path = Path(video_meta["path"])
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video file has expired")
+
+    audio_path = settings.TEMP_DIR / f"{video_id}_audio.wav"
+    try:
+        await audio_processor.extract_audio_from_video(video_path, audio_path)
+    except Exception as e:
+        logger.error(f"Audio extraction failed for {video_id}: {e}")
+        raise HTTPException(status_code=500, detail="Audio extraction failed")
+
+    _schedule_unlink(audio_path, delay=3600)
+    return {"video_id": video_id, "audio_file": str(audio_path.name)}
+
+
+@router.post("/translate-dub", response_model=DubbingResponse)
+async def translate_and_dub_video(request: DubbingRequest):
+    """Dub a video in a different language.
+
+    Translation of the source text is not implemented yet; the provided
+    text is synthesized directly in the target language.
+    """
+    if await video_store.get(request.video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found. Upload it first.")
+    return await dub_video(request)
+
+
+@router.get("/videos")
+async def list_uploaded_videos():
+    """List currently registered uploads."""
+    videos = await video_store.list_all()
+    return {
+        "videos": [
+            {
+                "video_id": video_id,
+                "filename": meta["filename"],
+                "duration": meta["info"]["duration"],
+                "has_faces": meta["has_faces"],
+            }
+            for video_id, meta in videos.items()
+        ]
+    }
+
+
+@router.get("/video/{video_id}")
+async def get_video(video_id: str, request: Request):
+    """Serve the dubbed output for a video, or the original upload.
+
+    Byte-range requests are honored so players can seek in long videos
+    without downloading the whole file.
+    """
+    output_path = settings.OUTPUT_DIR / f"{video_id}_dubbed.mp4"
+    if output_path.exists():
+        return _video_file_response(output_path, output_path.name, request)
+
+    video_meta = await video_store.get(video_id)
+    if video_meta is not None:
+        file_path = Path(video_meta["path"])
+        if file_path.exists():
+            return _video_file_response(file_path, video_meta["filename"], request)
+
+    raise HTTPException(status_code=404, detail="Video not found")
+
+
+def _video_file_response(file_path: Path, filename: str, request: Request):
+    stat_result = file_path.stat()
+
+    range_header = request.headers.get("range")
+    if range_header:
+        return _range_response(file_path, stat_result, range_header)
+
+    # Passing stat_result spares FileResponse a second stat syscall.
+    return FileResponse(
+        path=str(file_path),
+        stat_result=stat_result,
+        media_type="video/mp4",
+        filename=filename,
+        headers={"Accept-Ranges": "bytes", "Cache-Control": "public, max-age=3600"},
+    )
+
+
+def _range_response(file_path: Path, stat_result, range_header: str) -> StreamingResponse:
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip().lower() != "bytes":
+            raise ValueError(range_header)
+        start_raw, _, end_raw = spec.partition("-")
+        if start_raw:
+            start = int(start_raw)
+            end = int(end_raw) if end_raw else stat_result.st_size - 1
+        elif end_raw:
+            # Suffix form "bytes=-N": the last N bytes of the file.
+            start = max(stat_result.st_size - int(end_raw), 0)
+            end = stat_result.st_size - 1
+        else:
+            raise ValueError(range_header)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Invalid Range header")
+
+    if start > end or end >= stat_result.st_size:
+        raise HTTPException(status_code=416, detail="Range out of bounds")
+
+    async def _stream():
+        async with aiofiles.open(file_path, "rb") as f:
+            await f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(
+        _stream(),
+        status_code=206,
+        media_type="video/mp4",
+        headers={
+            "Content-Range": f"bytes {start}-{end}/{stat_result.st_size}",
+            "Content-Length": str(end - start + 1),
+            "Accept-Ranges": "bytes",
+        },
+    )
+
+
+@router.get("/stats")
+async def get_dubbing_stats():
+    """Basic service statistics."""
+    videos = await video_store.list_all()
+    return {
+        "uploaded_videos": len(videos),
+        "total_upload_bytes": sum(meta["file_size"] for meta in videos.values()),
+        "tts_concurrency": TTS_CONCURRENCY,
+        "lipsync_concurrency": LIPSYNC_CONCURRENCY,
+    }
+
+
+def _tts_cache_key(request: DubbingRequest, video_duration: float) -> str:
+    """Hash the inputs that determine the finished dub audio.
+
+    The video duration participates because the speed adjustment under
+    preserve_original_timing depends on it.
+    """
+    raw = (
+        f"{request.text}|{request.voice}|{request.language}"
+        f"|{request.preserve_original_timing}|{video_duration:.2f}"
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _tts_cache_get(key: str) -> Optional[Path]:
+    cached = _tts_cache.get(key)
+    if cached is None:
+        return None
+    if not cached.exists():
+        del _tts_cache[key]
+        return None
+    _tts_cache.move_to_end(key)
+    return cached
+
+
+def _tts_cache_put(key: str, source: Path) -> None:
+    cached = _TTS_CACHE_DIR / f"{key}.wav"
+    try:
+        cached.unlink(missing_ok=True)
+        os.link(source, cached)
+    except OSError:
+        shutil.copy(source, cached)
+    _tts_cache[key] = cached
+    while len(_tts_cache) > _TTS_CACHE_MAX_ENTRIES:
+        _, evicted = _tts_cache.popitem(last=False)
+        evicted.unlink(missing_ok=True)
+
+
+def _split_sentences(text: str) -> list:
+    """Split text on sentence boundaries, dropping empty fragments."""
+    return [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+
+async def _synthesize_text(tts_model, request: DubbingRequest, tts_audio_path: Path) -> None:
+    """Synthesize the dubbing text, chunked by sentence.
+
+    Long texts are split into sentences and synthesized back to back
+    in a single worker thread — the model is shared process-wide and
+    interleaved calls against it only thrash, which is why synthesis
+    concurrency is capped at one everywhere else — then concatenated
+    losslessly. Chunking still bounds each model call's length, which
+    keeps attention cost and peak memory flat for long scripts.
+    """
+    sentences = _split_sentences(request.text)
+    speaker_kwargs = model_manager.default_speaker_kwargs(tts_model)
+
+    if len(sentences) <= 1:
+        await asyncio.to_thread(
+            functools.partial(
+                tts_model.tts_to_file,
+                text=request.text,
+                file_path=str(tts_audio_path),
+                language=request.language,
+                **speaker_kwargs,
+            )
+        )
+        return
+
+    chunk_paths = [
+        tts_audio_path.with_name(f"{tts_audio_path.stem}_{i}.wav")
+        for i in range(len(sentences))
+    ]
+
+    def _synthesize_chunks() -> None:
+        for sentence, chunk_path in zip(sentences, chunk_paths):
+            tts_model.tts_to_file(
+                text=sentence,
+                file_path=str(chunk_path),
+                language=request.language,
+                **speaker_kwargs,
+            )
+
+    try:
+        await asyncio.to_thread(_synthesize_chunks)
+        await audio_processor.concat_audio(chunk_paths, tts_audio_path)
+    finally:
+        for chunk_path in chunk_paths:
+            chunk_path.unlink(missing_ok=True)
+
+
+async def _analyze_video(video_path: Path) -> dict:
+    """Probe a video and return basic stream info.
+
+    Uses PyAV in-process when available — spawning ffprobe costs tens
+    of milliseconds in fork and linking alone, which dominates for
+    small videos — and falls back to ffprobe otherwise.
+    """
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return await _analyze_video_ffprobe(video_path)
+    return await asyncio.get_running_loop().run_in_executor(
+        _cpu_pool, _analyze_video_av, str(video_path)
+    )
+
+
+def _analyze_video_av(video_path: str) -> dict:
+    import av
+
+    try:
+        with av.open(video_path) as container:
+            if not container.streams.video:
+                return {"valid": False, "error": "No video stream found"}
+            video_stream = container.streams.video[0]
+            duration = (
+                float(container.duration) / av.time_base if container.duration else 0.0
+            )
+            return {
+                "valid": True,
+                "duration": duration,
+                "width": video_stream.codec_context.width,
+                "height": video_stream.codec_context.height,
+                "fps": float(video_stream.average_rate or 25.0),
+                "format": container.format.name,
+            }
+    except Exception as e:
+        return {"valid": False, "error": f"Could not read video file: {e}"}
+
+
+async def _analyze_video_ffprobe(video_path: Path) -> dict:
+    cmd = [
+        "ffprobe",
+        "-v", "quiet",
+        "-print_format", "json",
+        "-select_streams", "v:0",
+        "-show_entries",
+        "stream=width,height,r_frame_rate,duration:format=duration,format_name",
+        str(video_path),
+    ]
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return {"valid": False, "error": "Could not read video file"}
+
+        probe = orjson.loads(stdout)
+        streams = probe.get("streams", [])
+        if not streams:
+            return {"valid": False, "error": "No video stream found"}
+        video_stream = streams[0]
+
+        # Fraction handles both "30000/1001" and plain "25" uniformly.
+        try:
+            fps = float(Fraction(video_stream.get("r_frame_rate", "25/1")))
+        except (ValueError, ZeroDivisionError):
+            fps = 25.0
+
+        return {
+            "valid": True,
+            "duration": float(probe["format"].get("duration", 0.0)),
+            "width": int(video_stream.get("width", 0)),
+            "height": int(video_stream.get("height", 0)),
+            "fps": fps,
+            "format": probe["format"].get("format_name", ""),
+        }
+    except Exception as e:
+        logger.error(f"Video analysis failed: {e}")
+        return {"valid": False, "error": str(e)}
+
+
+async def _detect_faces_in_video(video_path: Path) -> bool:
+    """Check whether the video contains faces suitable for lip-sync.
+
+    Samples one frame per second, runs the whole sample through the
+    SCRFD detector in a single batched ONNX call, and reports whether
+    any face scores above threshold. When no detector is available,
+    faces are assumed so the lip-sync path stays reachable.
+    """
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _cpu_pool, _detect_faces_sync, str(video_path)
+        )
+    except Exception as e:
+        logger.warning(f"Face detection failed, assuming faces present: {e}")
+        return True
+
+
+def _detect_faces_sync(video_path: str) -> bool:
+    import numpy as np
+
+    # Sessions are not picklable; each pool worker loads and caches its
+    # own through the model manager.
+    session = model_manager.get_face_detector()
+    if session is None:
+        return True
+
+    frames = _sample_frames(Path(video_path))
+    if frames is None or len(frames) == 0:
+        return True
+
+    # SCRFD expects 640x640 BGR input, normalized to [-1, 1].
+    import cv2
+
+    batch = np.stack(
+        [cv2.resize(frame, (640, 640)) for frame in frames]
+    ).astype(np.float32)
+    batch = (batch - 127.5) / 128.0
+    batch = batch.transpose(0, 3, 1, 2)
+
+    input_name = session.get_inputs()[0].name
+    outputs = session.run(None, {input_name: batch})
+    # The first output is the stride-8 sigmoid score map.
+    return bool((outputs[0] > 0.5).any())
+
+
+def _sample_frames(video_path: Path):
+    """Decode roughly one frame per second as a stacked array.
+
+    decord batches the decode in one call and avoids per-frame seeks;
+    cv2.VideoCapture is the fallback when it is not installed.
+    """
+    try:
+        from decord import VideoReader, cpu
+
+        reader = VideoReader(str(video_path), ctx=cpu(0))
+        if len(reader) == 0:
+            return None
+        step = max(int(round(reader.get_avg_fps() or 25.0)), 1)
+        return reader.get_batch(range(0, len(reader), step)).asnumpy()
+    except ImportError:
+        import cv2
+        import numpy as np
+
+        capture = cv2.VideoCapture(str(video_path))
+        step = max(int(round(capture.get(cv2.CAP_PROP_FPS) or 25.0)), 1)
+        frames = []
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+        capture.release()
+        return np.stack(frames) if frames else None
+
+
+async def _replace_video_audio(
+    video_path: Path, audio_path: Path, output_path: Path, reencode: bool = False
+) -> None:
+    """Mux the new audio track over the video stream.
+
+    The video stream is copied untouched by default. With
+    ``reencode=True`` (the Wav2Lip writer emits mp4v, which browsers
+    will not play) it is re-encoded to H.264, and long videos are
+    split into per-core segments encoded in parallel. +faststart moves
+    the moov atom to the front so browsers can start playback before
+    the whole file has downloaded.
+    """
+    if reencode:
+        duration = await audio_processor.get_audio_duration(video_path)
+        if duration > 60:
+            await _parallel_encode(video_path, audio_path, output_path, duration)
+            return
+
+    video_codec = ["-c:v", "libx264", "-preset", "veryfast"] if reencode else ["-c:v", "copy"]
+    cmd = [
+        "ffmpeg",
+        "-fflags", "+genpts",
+        "-i", str(video_path),
+        "-i", str(audio_path),
+        *video_codec,
+        "-c:a", "aac",
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-shortest",
+        "-movflags", "+faststart",
+        str(output_path),
+        "-y",
+    ]
+    # stderr goes to DEVNULL on the happy path; keeping it piped would
+    # make asyncio buffer megabytes of ffmpeg progress logs on long
+    # jobs. Failures re-run with -loglevel error to capture the cause.
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    await process.wait()
+    if process.returncode != 0:
+        error = await _capture_ffmpeg_error(cmd)
+        raise RuntimeError(f"ffmpeg mux failed: {error}")
+
+
+async def _parallel_encode(
+    video_path: Path, audio_path: Path, output_path: Path, duration: float
+) -> None:
+    """Encode a long video as per-core segments in parallel, then concat.
+
+    A single libx264 process stops scaling after a few threads, so the
+    timeline is cut into one segment per core, the segments are encoded
+    concurrently, and the results are joined with the concat demuxer
+    before the audio mux.
+    """
+    segments = max(2, min(os.cpu_count() or 2, int(duration // 30)))
+    span = duration / segments
+    segment_paths = [output_path.with_suffix(f".seg{i}.mp4") for i in range(segments)]
+    list_path = output_path.with_suffix(".segments.txt")
+
+    async def _encode_segment(index: int, segment_path: Path) -> None:
+        cmd = [
+            "ffmpeg",
+            "-ss", f"{index * span:.3f}",
+            "-to", f"{(index + 1) * span:.3f}",
+            "-i", str(video_path),
+            "-c:v", "libx264",
+            "-preset", "veryfast",
+            "-an",
+            str(segment_path),
+            "-y",
+        ]
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await process.wait()
+        if process.returncode != 0:
+            error = await _capture_ffmpeg_error(cmd)
+            raise RuntimeError(f"segment encode failed: {error}")
+
+    try:
+        await asyncio.gather(
+            *(_encode_segment(i, p) for i, p in enumerate(segment_paths))
+        )
+
+        list_path.write_text("".join(f"file '{p}'\n" for p in segment_paths))
+        cmd = [
+            "ffmpeg",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", str(list_path),
+            "-i", str(audio_path),
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-map", "0:v:0",
+            "-map", "1:a:0",
+            "-shortest",
+            "-movflags", "+faststart",
+            str(output_path),
+            "-y",
+        ]
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await process.wait()
+        if process.returncode != 0:
+            error = await _capture_ffmpeg_error(cmd)
+            raise RuntimeError(f"segment concat failed: {error}")
+    finally:
+        list_path.unlink(missing_ok=True)
+        for segment_path in segment_paths:
+            segment_path.unlink(missing_ok=True)
+
+
+async def _capture_ffmpeg_error(cmd: list) -> str:
+    """Re-run a failed ffmpeg command quietly and return its error output."""
+    process = await asyncio.create_subprocess_exec(
+        cmd[0], "-loglevel", "error", *cmd[1:],
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    return stderr.decode(errors="ignore")[-500:]
+
+
+async def _apply_wav2lip(video_path: Path, audio_path: Path, output_path: Path) -> None:
+    """Lip-sync the video to the new audio with the Wav2Lip generator.
+
+    Frames and mel chunks are fed to the compiled engine in batches; the
+    final A/V combination stays in ffmpeg. Falls back to a plain audio
+    replacement mux when the engine is unavailable.
+    """
+    engine = model_manager.get_wav2lip_engine()
+    if engine is None:
+        logger.info("Wav2Lip not available, falling back to audio replacement")
+        await _replace_video_audio(video_path, audio_path, output_path)
+        return
+
+    synced_path = output_path.with_suffix(".nosound.mp4")
+    try:
+        await asyncio.to_thread(_run_wav2lip_sync, engine, video_path, audio_path, synced_path)
+        await _replace_video_audio(synced_path, audio_path, output_path, reencode=True)
+    finally:
+        synced_path.unlink(missing_ok=True)
+
+
+def _run_wav2lip_sync(engine, video_path: Path, audio_path: Path, output_path: Path) -> None:
+    """Run batched Wav2Lip inference over the video frames.
+
+    Until the face detector provides boxes, the mouth crop is taken from
+    the lower-center region of each frame, which matches the typical
+    talking-head framing this endpoint is used for.
+    """
+    import cv2
+    import librosa
+    import numpy as np
+    import torch
+
+    device = next(engine.parameters()).device
+    batch_size = _wav2lip_batch_size(device)
+
+    wav, _ = librosa.load(str(audio_path), sr=16000)
+    mel = librosa.feature.melspectrogram(y=wav, sr=16000, n_fft=800, hop_length=200, n_mels=80)
+    mel = np.log(np.maximum(mel, 1e-5))
+
+    capture = cv2.VideoCapture(str(video_path))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = cv2.VideoWriter(
+        str(output_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+    )
+
+    # 16 mel steps per chunk at 80 fps mel rate, advanced by the video fps.
+    mel_step = 16
+    mel_idx_multiplier = 80.0 / fps
+
+    crop_size = min(height, width) // 2
+    x0 = (width - crop_size) // 2
+    y0 = height - crop_size
+
+    frames, mels = [], []
+    frame_idx = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            start = int(frame_idx * mel_idx_multiplier)
+            if start + mel_step > mel.shape[1]:
+                break
+            frames.append(frame)
+            mels.append(mel[:, start:start + mel_step])
+            frame_idx += 1
+
+            if len(frames) == batch_size:
+                _wav2lip_infer_batch(engine, device, frames, mels, (x0, y0, crop_size), writer)
+                frames, mels = [], []
+
+        if frames:
+            _wav2lip_infer_batch(engine, device, frames, mels, (x0, y0, crop_size), writer)
+    finally:
+        capture.release()
+        writer.release()
+
+
+def _wav2lip_infer_batch(engine, device, frames, mels, crop, writer) -> None:
+    """Run one forward pass over a batch of frames and write the results."""
+    import cv2
+    import numpy as np
+    import torch
+
+    x0, y0, size = crop
+    faces = np.stack(
+        [cv2.resize(f[y0:y0 + size, x0:x0 + size], (96, 96)) for f in frames]
+    ).astype(np.float32) / 255.0
+    masked = faces.copy()
+    masked[:, 96 // 2:] = 0.0
+
+    img_batch = np.concatenate((masked, faces), axis=3).transpose(0, 3, 1, 2)
+    mel_batch = np.stack(mels)[:, None].astype(np.float32)
+
+    with torch.inference_mode():
+        pred = engine(
+            torch.from_numpy(mel_batch).to(device),
+            torch.from_numpy(img_batch).to(device),
+        )
+    pred = (pred.cpu().numpy().transpose(0, 2, 3, 1) * 255.0).astype(np.uint8)
+
+    for frame, face in zip(frames, pred):
+        frame[y0:y0 + size, x0:x0 + size] = cv2.resize(face, (size, size))
+        writer.write(frame)
+
+
+def _wav2lip_batch_size(device) -> int:
+    """Pick a batch size from free VRAM; generous on GPU, modest on CPU."""
+    import torch
+
+    if device.type != "cuda":
+        return 8
+    free, _ = torch.cuda.mem_get_info(device)
+    # ~50 MB of activations per 96x96 sample is a safe upper bound.
+    return max(8, min(128, int(free // (50 * 1024 * 1024))))
+
+
+def _schedule_unlink(file_path: Path, delay: int = 7200) -> None:
+    """Schedule deletion of a temporary file after a delay.
+
+    A call_later timer handle costs ~100 bytes, versus the multi-KB
+    coroutine frame that an awaited asyncio.sleep task would pin for
+    hours per file. Metadata expiry is handled by the video store's
+    TTL; only the on-disk file needs explicit cleanup here.
+    """
+    asyncio.get_running_loop().call_later(
+        delay, functools.partial(_safe_unlink, file_path)
+    )
+
+
+def _safe_unlink(file_path: Path) -> None:
+    try:
+        if file_path.exists():
+            file_path.unlink()
+            logger.info(f"Cleaned up {file_path.name}")
+    except OSError as e:
+        logger.warning(f"Cleanup failed for {file_path}: {e}")
@@ -0,0 +1,807 @@
+"""Text-to-speech endpoints.
+
+Four engines sit behind one interface: pyttsx3 (offline system
+voices), gTTS and Edge TTS (online services), and YourTTS (neural,
+multilingual, with speaker references).
+"""
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import re
+import time
+import os
+import threading
+from secrets import token_hex
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import aiofiles
+import orjson
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+
+from ..config import settings
+from ..services import audio_processor, model_manager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyttsx3
+
+    HAS_PYTTSX3 = True
+except ImportError:
+    HAS_PYTTSX3 = False
+
+try:
+    from gtts import gTTS
+
+    HAS_GTTS = True
+except ImportError:
+    HAS_GTTS = False
+
+try:
+    import httpx
+
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    import edge_tts
+
+    HAS_EDGE_TTS = True
+except ImportError:
+    HAS_EDGE_TTS = False
+
+router = APIRouter(prefix="/api/tts", tags=["tts"])
+
+# pyttsx3's engine object is not reentrant; a single-worker executor
+# both serializes access to it and keeps runAndWait off the event loop.
+PYTTSX3_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+TTS_VOICES = ["neutral", "male", "female", "young", "old"]
+
+# Reference clips for cloning are a few seconds of speech; anything
+# beyond this is a mis-upload and is rejected mid-stream.
+MAX_REF_SIZE = 20 * 1024 * 1024
+
+# Edge TTS voice selection, precomputed: logical voice -> neural
+# voice, with non-English languages overriding by two-letter prefix.
+EDGE_VOICE_MAP = {
+    "neutral": "en-US-AriaNeural",
+    "male": "en-US-GuyNeural",
+    "female": "en-US-JennyNeural",
+    "young": "en-US-AnaNeural",
+    "old": "en-GB-RyanNeural",
+}
+EDGE_LANG_OVERRIDES = {
+    "es": "es-ES-ElviraNeural",
+    "fr": "fr-FR-DeniseNeural",
+    "de": "de-DE-KatjaNeural",
+}
+
+# How gTTS's RPC response wraps the base64 audio payload.
+_GTTS_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"\]')
+
+# audio_id -> output path for O(1) downloads; rebuilt lazily from the
+# known filename patterns after a restart.
+AUDIO_INDEX = {}
+
+# voice -> speaker-selection kwargs for YourTTS; embeddings are
+# computed once per canonical voice instead of per request.
+SPEAKER_CACHE = {}
+
+_gtts_client = None
+
+
+def _get_gtts_client():
+    """Shared pooled async client; amortizes TLS handshakes."""
+    global _gtts_client
+    if _gtts_client is None:
+        _gtts_client = httpx.AsyncClient(timeout=30.0)
+    return _gtts_client
+
+
+class TTSGenerationRequest(BaseModel):
+    # Range checks live in Field constraints so pydantic enforces them
+    # in its compiled validation pass and they surface in the OpenAPI
+    # schema; only the whitespace strip still needs Python.
+    text: str = Field(..., min_length=1, max_length=settings.MAX_TEXT_LENGTH)
+    engine: str = "yourtts"
+    voice: str = "neutral"
+    language: str = "en"
+    speed: float = Field(1.0, ge=0.5, le=2.0)
+    pitch: float = Field(0.0, ge=-12.0, le=12.0)
+
+    @field_validator("text")
+    @classmethod
+    def text_must_not_be_blank(cls, v):
+        if not v.strip():
+            raise ValueError("Text must not be empty")
+        return v.strip()
+
+
+class TTSEngine:
+    """Base interface every TTS engine implements."""
+
+    name = ""
+    description = ""
+    available = False
+    # Engines that coalesce requests internally hold their semaphore
+    # around the model pass themselves; the routes must not also hold
+    # it across synthesize(), or queue entry serializes and batches
+    # never grow past one item.
+    manages_concurrency = False
+
+    async def synthesize(self, request: TTSGenerationRequest):
+        """Synthesize speech; returns (audio_id, output_path)."""
+        raise NotImplementedError
+
+    async def synthesize_batch(self, requests: List[TTSGenerationRequest]):
+        """Synthesize several requests, preserving order.
+
+        Returns one (audio_id, output_path) tuple — or the exception
+        that item raised — per request. The default fans out through
+        synthesize(); engines with a cheaper whole-batch path override
+        it.
+        """
+        return await asyncio.gather(
+            *(self.synthesize(request) for request in requests), return_exceptions=True
+        )
+
+
+class Pyttsx3Engine(TTSEngine):
+    name = "pyttsx3"
+    description = "Offline system voices (pyttsx3)"
+    available = HAS_PYTTSX3
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+        self._voice_cache = {}
+
+    def _get_engine(self):
+        with self._lock:
+            if self._engine is None:
+                self._engine = pyttsx3.init()
+                self._build_voice_cache()
+        return self._engine
+
+    def _build_voice_cache(self) -> None:
+        """Map each logical voice to a system voice id, once.
+
+        getProperty('voices') walks the platform voice list (dozens of
+        COM calls under SAPI) — far too expensive to repeat on every
+        request just to re-find the same five voices.
+        """
+        voices = self._engine.getProperty("voices")
+        for logical in TTS_VOICES:
+            for voice in voices:
+                if logical in (voice.name or "").lower():
+                    self._voice_cache[logical] = voice.id
+                    break
+
+    async def synthesize(self, request: TTSGenerationRequest):
+        audio_id = token_hex(8)
+        output_path = settings.OUTPUT_DIR / f"pyttsx3_{audio_id}.wav"
+        await asyncio.get_running_loop().run_in_executor(
+            PYTTSX3_EXECUTOR, self._run_pyttsx3, request, output_path
+        )
+        return audio_id, output_path
+
+    def _run_pyttsx3(self, request: TTSGenerationRequest, output_path: Path) -> None:
+        engine = self._get_engine()
+        with self._lock:
+            voice_id = self._voice_cache.get(request.voice)
+            if voice_id is not None:
+                engine.setProperty("voice", voice_id)
+            engine.setProperty("rate", int(200 * request.speed))
+            engine.save_to_file(request.text, str(output_path))
+            engine.runAndWait()
+
+
+class GTTSEngine(TTSEngine):
+    name = "gtts"
+    description = "Google Translate TTS (online)"
+    available = HAS_GTTS
+
+    async def synthesize(self, request: TTSGenerationRequest):
+        audio_id = token_hex(8)
+        output_path = settings.OUTPUT_DIR / f"gtts_{audio_id}.mp3"
+        tts = gTTS(text=request.text, lang=request.language, slow=(request.speed < 0.9))
+        if HAS_HTTPX:
+            await self._fetch_async(tts, output_path)
+        else:
+            await asyncio.to_thread(tts.save, str(output_path))
+        return audio_id, output_path
+
+    async def _fetch_async(self, tts, output_path: Path) -> None:
+        """Fetch the audio over the shared async client.
+
+        tts.save() performs its HTTPS round trips and disk writes
+        synchronously; replaying the requests gTTS prepares through the
+        pooled AsyncClient and streaming the decoded chunks out with
+        aiofiles keeps the event loop serving during the fetch.
+        """
+        client = _get_gtts_client()
+        async with aiofiles.open(output_path, "wb") as f:
+            for prepared in tts._prepare_requests():
+                response = await client.request(
+                    prepared.method,
+                    prepared.url,
+                    headers=dict(prepared.headers),
+                    content=prepared.body,
+                )
+                response.raise_for_status()
+                for line in response.text.splitlines():
+                    match = _GTTS_AUDIO_RE.search(line)
+                    if match:
+                        await f.write(base64.b64decode(match.group(1).encode("ascii")))
+
+
+class EdgeTTSEngine(TTSEngine):
+    name = "edge_tts"
+    description = "Microsoft Edge neural voices (online)"
+    available = HAS_EDGE_TTS
+
+    def _build_communicate(self, request: TTSGenerationRequest):
+        selected_voice = EDGE_LANG_OVERRIDES.get(
+            request.language[:2], EDGE_VOICE_MAP.get(request.voice, "en-US-AriaNeural")
+        )
+        rate = f"{int((request.speed - 1.0) * 100):+d}%"
+        # edge-tts builds its own aiohttp session inside stream() and
+        # exposes no way to supply one, so each request pays its own
+        # connection; revisit if upstream ever adds session reuse.
+        return edge_tts.Communicate(request.text, selected_voice, rate=rate)
+
+    async def synthesize(self, request: TTSGenerationRequest):
+        audio_id = token_hex(8)
+        output_path = settings.OUTPUT_DIR / f"edge_tts_{audio_id}.mp3"
+        communicate = self._build_communicate(request)
+        async with aiofiles.open(output_path, "wb") as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    await f.write(chunk["data"])
+        return audio_id, output_path
+
+
+class YourTTSEngine(TTSEngine):
+    name = "yourtts"
+    description = "YourTTS neural voice (multilingual, voice cloning)"
+    available = True
+    manages_concurrency = True
+
+    # Requests landing within one tick share a single model pass
+    # instead of each paying their own thread dispatch and model setup.
+    MAX_BATCH = 8
+    BATCH_WAIT = 0.01  # seconds
+
+    def __init__(self):
+        self._queue = None
+
+    def _get_speaker_reference(self, voice: str):
+        ref = settings.BASE_DIR / "speakers" / f"{voice}.wav"
+        return str(ref) if ref.exists() else None
+
+    def _resolve_speaker(self, tts_model, voice: str) -> dict:
+        """Speaker-selection kwargs for a canonical voice.
+
+        Passing speaker_wav makes the model reload, resample and
+        re-encode the same reference clip on every request. The
+        embedding is computed once per voice, registered with the
+        model's speaker manager under a synthetic name, and selected
+        by name afterwards; if the manager refuses, the path is cached
+        instead so at least the lookup stays O(1).
+        """
+        ref = self._get_speaker_reference(voice)
+        if ref is None:
+            # No bundled reference clip for this voice: your_tts still
+            # needs a speaker, so fall back to the model's first
+            # built-in one.
+            return model_manager.default_speaker_kwargs(tts_model)
+        cached = SPEAKER_CACHE.get(voice)
+        if cached is None:
+            try:
+                manager = tts_model.synthesizer.tts_model.speaker_manager
+                embedding = manager.compute_embedding_from_clip(ref)
+                name = f"cached_{voice}"
+                manager.embeddings[name] = {"name": name, "embedding": embedding}
+                # Name lookup resolves through embeddings_by_names,
+                # which the manager materializes only when it loads a
+                # speakers file, so register there too — and prove the
+                # name actually resolves before caching kwargs that
+                # every later request will reuse.
+                manager.embeddings_by_names.setdefault(name, []).append(embedding)
+                manager.get_mean_embedding(name)
+                cached = {"speaker": name}
+            except Exception as e:
+                logger.warning(f"Speaker embedding cache unavailable for '{voice}': {e}")
+                cached = {"speaker_wav": ref}
+            SPEAKER_CACHE[voice] = cached
+        return cached
+
+    async def synthesize(self, request: TTSGenerationRequest):
+        audio_id = token_hex(8)
+        output_path = settings.OUTPUT_DIR / f"yourtts_{audio_id}.wav"
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            asyncio.ensure_future(self._batcher_loop())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, output_path, future))
+        await future
+        return audio_id, output_path
+
+    async def _batcher_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.BATCH_WAIT
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                async with ENGINE_SEMAPHORES[self.name]:
+                    errors = await asyncio.to_thread(self._synthesize_batch_sync, batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+            for (_, _, future), error in zip(batch, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def synthesize_batch(self, requests: List[TTSGenerationRequest]):
+        """Run a whole group through one model pass, bypassing the
+        queue — the caller has already assembled the batch."""
+        items = []
+        for request in requests:
+            audio_id = token_hex(8)
+            items.append((request, settings.OUTPUT_DIR / f"yourtts_{audio_id}.wav", None))
+        async with ENGINE_SEMAPHORES[self.name]:
+            errors = await asyncio.to_thread(self._synthesize_batch_sync, items)
+        return [
+            error if error is not None else (output_path.stem.split("_", 1)[1], output_path)
+            for (request, output_path, _), error in zip(items, errors)
+        ]
+
+    def _synthesize_batch_sync(self, batch):
+        """Run one drained batch through the model on a single thread.
+
+        One executor hop and one model lookup per tick rather than per
+        request; items are synthesized back to back so GPU work never
+        interleaves, and a failure in one item does not fail its
+        batchmates.
+        """
+        tts_model = model_manager.get_tts_model()
+        errors = []
+        for request, output_path, _ in batch:
+            try:
+                tts_model.tts_to_file(
+                    text=request.text,
+                    file_path=str(output_path),
+                    language=request.language,
+                    **self._resolve_speaker(tts_model, request.voice),
+                )
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+
+# Engines are registered as factories and built on first use: import
+# keeps startup fast, and an engine nobody requests never allocates
+# its engine object, queue, or caches. Name, description and
+# availability are class attributes, so /engines needs no instances.
+ENGINE_FACTORIES = {
+    "pyttsx3": Pyttsx3Engine,
+    "gtts": GTTSEngine,
+    "edge_tts": EdgeTTSEngine,
+    "yourtts": YourTTSEngine,
+}
+
+# Both catalog endpoints serve data that is fixed once imports have
+# resolved, so the JSON bytes are rendered here exactly once and each
+# request is a constant-body Response.
+ENGINES_JSON = orjson.dumps(
+    {
+        "engines": [
+            {
+                "name": name,
+                "description": factory.description,
+                "available": factory.available,
+                "voices": TTS_VOICES,
+            }
+            for name, factory in ENGINE_FACTORIES.items()
+        ]
+    }
+)
+
+_LANGUAGES = [
+    {"code": "en", "name": "English"},
+    {"code": "es", "name": "Spanish"},
+    {"code": "fr", "name": "French"},
+    {"code": "de", "name": "German"},
+    {"code": "it", "name": "Italian"},
+    {"code": "pt", "name": "Portuguese"},
+    {"code": "pl", "name": "Polish"},
+    {"code": "nl", "name": "Dutch"},
+    {"code": "ru", "name": "Russian"},
+    {"code": "tr", "name": "Turkish"},
+    {"code": "ar", "name": "Arabic"},
+    {"code": "hi", "name": "Hindi"},
+    {"code": "zh", "name": "Chinese"},
+    {"code": "ja", "name": "Japanese"},
+    {"code": "ko", "name": "Korean"},
+    {"code": "auto", "name": "Auto-detect"},
+]
+LANGUAGES_JSON = orjson.dumps({"languages": _LANGUAGES, "total": len(_LANGUAGES)})
+
+_engine_instances = {}
+
+
+def _engine_semaphore_limit(name: str, default: int) -> int:
+    return int(os.getenv(f"TTS_{name.upper()}_CONCURRENCY", str(default)))
+
+
+# Compute-bound engines thrash when oversubscribed (model inference,
+# the non-reentrant pyttsx3 engine); the online services tolerate
+# fan-out. Tunable per deployment through TTS_<ENGINE>_CONCURRENCY.
+ENGINE_SEMAPHORES = {
+    "yourtts": asyncio.Semaphore(_engine_semaphore_limit("yourtts", 1)),
+    "pyttsx3": asyncio.Semaphore(_engine_semaphore_limit("pyttsx3", 1)),
+    "edge_tts": asyncio.Semaphore(_engine_semaphore_limit("edge_tts", 5)),
+    "gtts": asyncio.Semaphore(_engine_semaphore_limit("gtts", 5)),
+}
+
+
+def get_tts_engine(name: str) -> TTSEngine:
+    """Return the lazily created singleton for an engine name."""
+    engine = _engine_instances.get(name)
+    if engine is None:
+        engine = _engine_instances.setdefault(name, ENGINE_FACTORIES[name]())
+    return engine
+
+
+def _engine_guard(name: str):
+    """Concurrency guard for a route-level synthesis call.
+
+    Self-batching engines acquire their semaphore around the model
+    pass instead, so requests can queue up and share a batch.
+    """
+    if get_tts_engine(name).manages_concurrency:
+        return contextlib.nullcontext()
+    return ENGINE_SEMAPHORES[name]
+
+
+@router.get("/engines")
+async def get_available_engines():
+    """List TTS engines and their availability."""
+    return Response(content=ENGINES_JSON, media_type="application/json")
+
+
+@router.get("/languages")
+async def get_supported_languages():
+    """List languages accepted by /synthesize."""
+    return Response(content=LANGUAGES_JSON, media_type="application/json")
+
+
+@router.post("/synthesize")
+async def synthesize_speech(request: TTSGenerationRequest):
+    """Synthesize speech from text with the selected engine."""
+    if request.engine not in ENGINE_FACTORIES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine '{request.engine}'")
+    tts_engine = get_tts_engine(request.engine)
+    if not tts_engine.available:
+        raise HTTPException(status_code=400, detail=f"Engine '{request.engine}' is not installed")
+
+    # Synthesis is deterministic in the request parameters, so repeated
+    # requests (replays, demo phrases) are served straight from disk.
+    key = _cache_key(request)
+    ext = "mp3" if request.engine in ("gtts", "edge_tts") else "wav"
+    cache_path = settings.OUTPUT_DIR / f"cache_{key}.{ext}"
+    if cache_path.exists():
+        AUDIO_INDEX[key] = cache_path
+        return {
+            "audio_id": key,
+            "audio_url": f"/api/tts/download/{key}",
+            "engine": request.engine,
+            "processing_time": 0.0,
+            "cached": True,
+        }
+
+    start_time = time.time()
+    try:
+        async with _engine_guard(request.engine):
+            audio_id, output_path = await tts_engine.synthesize(request)
+        return await _finalize_synthesis(
+            request, key, output_path, start_time, cache_path=cache_path
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Synthesis failed with {request.engine}: {e}")
+        raise HTTPException(status_code=500, detail=f"Synthesis failed: {e}")
+
+
+@router.post("/synthesize/stream")
+async def synthesize_speech_stream(request: TTSGenerationRequest):
+    """Stream synthesized audio to the client as it is generated.
+
+    The file-based /synthesize only responds once the whole utterance
+    exists on disk; here Edge TTS chunks are forwarded as they arrive,
+    so playback can start after the first chunk (~hundreds of
+    milliseconds) instead of after the full synthesis.
+    """
+    if request.engine != "edge_tts":
+        raise HTTPException(status_code=400, detail="Streaming is only supported for edge_tts")
+    if not HAS_EDGE_TTS:
+        raise HTTPException(status_code=400, detail="Engine 'edge_tts' is not installed")
+
+    communicate = get_tts_engine("edge_tts")._build_communicate(request)
+
+    async def stream_generator():
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+    return StreamingResponse(stream_generator(), media_type="audio/mpeg")
+
+
+def _cache_key(request: TTSGenerationRequest) -> str:
+    """Stable digest of every parameter that shapes the audio."""
+    canonical = json.dumps(request.model_dump(), sort_keys=True).encode()
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+async def _finalize_synthesis(
+    request: TTSGenerationRequest,
+    audio_id: str,
+    output_path: Path,
+    start_time: float,
+    cache_path: Path = None,
+) -> dict:
+    """Index and post-process one finished synthesis."""
+    # One decode/encode pass for both operations; skipped outright
+    # for the online mp3 engines when no pitch change is wanted,
+    # since their output is already level-tuned.
+    if not (request.pitch == 0.0 and request.engine in ("gtts", "edge_tts")):
+        await audio_processor.postprocess(output_path, request.pitch)
+
+    if cache_path is not None:
+        # Publish atomically only once fully processed, so a concurrent
+        # cache hit never sees a half-written or un-postprocessed file.
+        os.replace(output_path, cache_path)
+        output_path = cache_path
+
+    AUDIO_INDEX[audio_id] = output_path
+
+    return {
+        "audio_id": audio_id,
+        "audio_url": f"/api/tts/download/{audio_id}",
+        "engine": request.engine,
+        "processing_time": round(time.time() - start_time, 3),
+    }
+
+
+@router.post("/batch-synthesize")
+async def batch_synthesize(requests: List[TTSGenerationRequest]):
+    """Synthesize up to ten texts, batching within each engine."""
+    if len(requests) > 10:
+        raise HTTPException(status_code=400, detail="At most 10 requests per batch")
+
+    responses = [None] * len(requests)
+
+    # Group by everything that must match within one engine batch, so
+    # each group can go through the engine's synthesize_batch in one
+    # call instead of ten independent ones.
+    groups = {}
+    for idx, request in enumerate(requests):
+        if request.engine not in ENGINE_FACTORIES or not ENGINE_FACTORIES[request.engine].available:
+            responses[idx] = {"engine": request.engine, "error": f"Engine '{request.engine}' is unavailable"}
+            continue
+        key = (request.engine, request.voice, request.language, request.speed)
+        groups.setdefault(key, []).append(idx)
+
+    async def run_group(engine_name: str, indices):
+        engine = get_tts_engine(engine_name)
+        start_time = time.time()
+        try:
+            async with _engine_guard(engine_name):
+                results = await engine.synthesize_batch([requests[i] for i in indices])
+        except Exception as e:
+            for idx in indices:
+                responses[idx] = {"engine": engine_name, "error": str(e)}
+            return
+        for idx, result in zip(indices, results):
+            if isinstance(result, Exception):
+                responses[idx] = {"engine": engine_name, "error": str(result)}
+            else:
+                audio_id, output_path = result
+                responses[idx] = await _finalize_synthesis(
+                    requests[idx], audio_id, output_path, start_time
+                )
+
+    await asyncio.gather(*(run_group(key[0], indices) for key, indices in groups.items()))
+    return {"results": responses}
+
+
+@router.get("/download/{audio_id}")
+async def download_audio(audio_id: str):
+    """Download a previously synthesized audio file."""
+    # One stat per candidate does double duty: existence check here and
+    # Content-Length/ETag/Last-Modified inside FileResponse, which would
+    # otherwise stat the file again before the sendfile.
+    audio_file = AUDIO_INDEX.get(audio_id)
+    stat_result = None
+    if audio_file is not None:
+        try:
+            stat_result = audio_file.stat()
+        except FileNotFoundError:
+            del AUDIO_INDEX[audio_id]
+            audio_file = None
+    if audio_file is None:
+        # Index miss (restart): probe the handful of known filename
+        # shapes directly instead of globbing the whole output
+        # directory, which costs a readdir proportional to history.
+        for prefix, ext in (
+            ("yourtts", "wav"),
+            ("edge_tts", "mp3"),
+            ("gtts", "mp3"),
+            ("pyttsx3", "wav"),
+            ("cloned", "wav"),
+            ("cache", "wav"),
+            ("cache", "mp3"),
+        ):
+            candidate = settings.OUTPUT_DIR / f"{prefix}_{audio_id}.{ext}"
+            try:
+                stat_result = candidate.stat()
+            except FileNotFoundError:
+                continue
+            audio_file = candidate
+            AUDIO_INDEX[audio_id] = candidate
+            break
+    if audio_file is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+
+    media_type = "audio/mpeg" if audio_file.suffix == ".mp3" else "audio/wav"
+    return FileResponse(
+        path=str(audio_file),
+        stat_result=stat_result,
+        media_type=media_type,
+        filename=audio_file.name,
+    )
+
+
+@router.post("/clone")
+async def clone_voice(
+    text: str = Form(...),
+    language: str = Form("en"),
+    reference_audio: UploadFile = File(...),
+):
+    """Synthesize text in the voice of an uploaded reference clip."""
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Text must not be empty")
+
+    audio_id = token_hex(8)
+    ref_audio_path = settings.TEMP_DIR / f"ref_{audio_id}.wav"
+    output_path = settings.OUTPUT_DIR / f"cloned_{audio_id}.wav"
+
+    try:
+        # Copy in 64 KB chunks so the reference clip never sits in
+        # memory whole, and enforce the size cap as bytes arrive
+        # instead of after buffering an oversized upload.
+        received = 0
+        async with aiofiles.open(ref_audio_path, "wb") as f:
+            while chunk := await reference_audio.read(65536):
+                received += len(chunk)
+                if received > MAX_REF_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Reference audio exceeds {MAX_REF_SIZE // (1024 * 1024)} MB",
+                    )
+                await f.write(chunk)
+
+        tts_model = model_manager.get_tts_model()
+        await asyncio.to_thread(
+            tts_model.tts_to_file,
+            text=text.strip(),
+            file_path=str(output_path),
+            language=language,
+            speaker_wav=str(ref_audio_path),
+        )
+        AUDIO_INDEX[audio_id] = output_path
+
+        return {
+            "audio_id": audio_id,
+            "audio_url": f"/api/tts/download/{audio_id}",
+            "message": "Voice cloned successfully",
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Voice cloning failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Voice cloning failed: {e}")
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            ref_audio_path.unlink()
+
+
+# Retention is enforced by one periodic sweep instead of one sleeping
+# task per file; cache entries live a day, everything else an hour.
+# OUTPUT_DIR is shared with the dubbing and privacy routers, which
+# promise longer retention for their outputs, so the sweep only
+# touches filenames this router writes.
+SWEEP_INTERVAL = 300
+AUDIO_TTL = 3600
+CACHE_TTL = 86400
+SWEEP_PREFIXES = ("yourtts_", "edge_tts_", "gtts_", "pyttsx3_", "cloned_", "cache_")
+
+
+def _sweep_output_dir() -> None:
+    """Delete this router's files whose retention window has passed."""
+    now = time.time()
+    with os.scandir(settings.OUTPUT_DIR) as entries:
+        for entry in entries:
+            if not entry.name.startswith(SWEEP_PREFIXES):
+                continue
+            ttl = CACHE_TTL if entry.name.startswith("cache_") else AUDIO_TTL
+            with contextlib.suppress(FileNotFoundError):
+                if now - entry.stat().st_mtime > ttl:
+                    os.unlink(entry.path)
+
+
+@router.on_event("startup")
+async def _start_output_sweeper() -> None:
+    async def _sweeper():
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try:
+                await asyncio.to_thread(_sweep_output_dir)
+            except Exception as e:
+                logger.warning(f"Output sweep failed: {e}")
+
+    asyncio.ensure_future(_sweeper())
+
+
+@router.on_event("startup")
+async def _warm_up_yourtts() -> None:
+    """Load YourTTS and synthesize one throwaway token at startup.
+
+    The first real request otherwise pays the multi-second checkpoint
+    load plus lazy CUDA initialization on the serving path. Set
+    TTS_PRELOAD=0 to skip (CI, dev machines without the checkpoint).
+    """
+    if os.environ.get("TTS_PRELOAD", "1") != "1":
+        return
+    try:
+        tts_model = await asyncio.to_thread(model_manager.get_tts_model)
+        # your_tts refuses a call that names no speaker, which would
+        # turn the warm-up into a swallowed warning and leave CUDA
+        # init on the first real request anyway.
+        speaker_kwargs = model_manager.default_speaker_kwargs(tts_model)
+        await asyncio.to_thread(lambda: tts_model.tts("a", language="en", **speaker_kwargs))
+        logger.info("YourTTS warmed up")
+    except Exception as e:
+        logger.warning(f"YourTTS warm-up failed: {e}")
+
+
+@router.on_event("shutdown")
+async def _close_http_clients() -> None:
+    if _gtts_client is not None:
+        await _gtts_client.aclose()
@@ -0,0 +1,173 @@
+"""Lazy singletons for the heavyweight ML models.
+
+Models are loaded on first use and cached for the lifetime of the
+process so repeat requests never pay the load cost again.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_tts_model = None
+_tts_lock = threading.Lock()
+
+_wav2lip_engine = None
+_wav2lip_lock = threading.Lock()
+_wav2lip_failed = False
+
+_face_detector = None
+_face_lock = threading.Lock()
+_face_failed = False
+
+
+def get_tts_model():
+    """Load the Coqui TTS model on first use and reuse it afterwards."""
+    global _tts_model
+    if _tts_model is None:
+        with _tts_lock:
+            if _tts_model is None:
+                from TTS.api import TTS
+
+                logger.info("Loading TTS model (first request)...")
+                _tts_model = TTS("tts_models/multilingual/multi-dataset/your_tts")
+                _apply_tts_precision(_tts_model)
+                logger.info("TTS model loaded")
+    return _tts_model
+
+
+def default_speaker_kwargs(tts=None) -> dict:
+    """Speaker kwargs for synthesis calls that have no reference voice.
+
+    your_tts is multi-speaker and refuses calls that name no speaker,
+    so callers without a reference clip pass these kwargs to use the
+    model's first built-in speaker. Single-speaker models get an
+    empty dict.
+    """
+    if tts is None:
+        tts = get_tts_model()
+    speakers = getattr(tts, "speakers", None)
+    if speakers:
+        return {"speaker": speakers[0]}
+    return {}
+
+
+def _apply_tts_precision(tts) -> None:
+    """Reduce the TTS model precision per the TTS_PRECISION env var.
+
+    bf16 halves memory traffic on CUDA; int8 dynamically quantizes the
+    Linear layers, roughly halving the CPU model's footprint. fp32 (the
+    default) leaves the checkpoint untouched. Callers are unaffected
+    since they only go through tts_to_file.
+    """
+    precision = os.getenv("TTS_PRECISION", "fp32").lower()
+    if precision == "fp32":
+        return
+
+    import platform
+
+    import torch
+
+    try:
+        model = tts.synthesizer.tts_model
+        if precision == "bf16":
+            if not torch.cuda.is_available():
+                logger.warning("TTS_PRECISION=bf16 needs CUDA; keeping fp32")
+                return
+            tts.synthesizer.tts_model = model.to(torch.bfloat16)
+        elif precision == "int8":
+            torch.backends.quantized.engine = (
+                "qnnpack" if platform.machine() in ("arm64", "aarch64") else "fbgemm"
+            )
+            tts.synthesizer.tts_model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        else:
+            logger.warning(f"Unknown TTS_PRECISION '{precision}'; keeping fp32")
+            return
+        logger.info(f"TTS model running at {precision}")
+    except Exception as e:
+        logger.warning(f"Could not apply TTS_PRECISION={precision}: {e}")
+
+
+def get_wav2lip_engine():
+    """Load (and torch.compile) the Wav2Lip generator once.
+
+    Returns None when torch or the checkpoint is unavailable so callers
+    can fall back to a plain audio remux. A failed load is remembered so
+    requests do not retry it.
+    """
+    global _wav2lip_engine, _wav2lip_failed
+    if _wav2lip_engine is None and not _wav2lip_failed:
+        with _wav2lip_lock:
+            if _wav2lip_engine is None and not _wav2lip_failed:
+                _wav2lip_engine = _load_wav2lip_engine()
+                _wav2lip_failed = _wav2lip_engine is None
+    return _wav2lip_engine
+
+
+def _load_wav2lip_engine():
+    checkpoint = os.getenv("WAV2LIP_CHECKPOINT", "")
+    if not checkpoint or not Path(checkpoint).exists():
+        logger.info("Wav2Lip checkpoint not configured; lip-sync disabled")
+        return None
+
+    try:
+        import torch
+        from wav2lip.models import Wav2Lip
+    except ImportError as e:
+        logger.warning(f"Wav2Lip dependencies missing: {e}")
+        return None
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Loading Wav2Lip checkpoint on {device}...")
+    model = Wav2Lip()
+    state = torch.load(checkpoint, map_location=device)
+    weights = state.get("state_dict", state)
+    model.load_state_dict({k.replace("module.", ""): v for k, v in weights.items()})
+    model = model.to(device).eval()
+
+    try:
+        model = torch.compile(model, mode="reduce-overhead")
+        logger.info("Wav2Lip generator compiled with torch.compile")
+    except Exception as e:
+        logger.warning(f"torch.compile unavailable, running eager: {e}")
+    return model
+
+
+def get_face_detector():
+    """Load the SCRFD face-detection ONNX session once.
+
+    Uses the CUDA execution provider when available, falling back to
+    CPU. Returns None when onnxruntime or the model file is missing.
+    """
+    global _face_detector, _face_failed
+    if _face_detector is None and not _face_failed:
+        with _face_lock:
+            if _face_detector is None and not _face_failed:
+                _face_detector = _load_face_detector()
+                _face_failed = _face_detector is None
+    return _face_detector
+
+
+def _load_face_detector():
+    model_path = os.getenv(
+        "FACE_DETECTOR_MODEL",
+        str(Path(__file__).resolve().parent.parent.parent / "models" / "scrfd_500m_quant.onnx"),
+    )
+    if not Path(model_path).exists():
+        logger.info("Face detector model not found; face checks disabled")
+        return None
+
+    try:
+        import onnxruntime
+    except ImportError:
+        logger.warning("onnxruntime not installed; face checks disabled")
+        return None
+
+    return onnxruntime.InferenceSession(
+        model_path,
+        providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+    )
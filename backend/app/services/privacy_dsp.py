@@ -0,0 +1,191 @@
+"""GPU STFT/iSTFT pipeline for the privacy conversions.
+
+torchlibrosa reimplements librosa's STFT as conv1d modules that match
+librosa numerically to ~1e-5 while running batched on CUDA. The module
+instances are built once at first use and reused across requests;
+callers fall back to the librosa path when torch/torchlibrosa or a GPU
+is unavailable.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Micro-batching: concurrent spectral_shift calls arriving within
+# MAX_WAIT of each other are padded to a common length and pushed
+# through one batched STFT/iSTFT instead of one FFT call each.
+MAX_BATCH = 16
+MAX_WAIT = 0.005  # seconds
+
+_loop = None
+_queue = None
+
+# The batch worker gets its own thread: converter calls block a
+# default-executor slot each while waiting on their future, so running
+# _shift_batch through the default executor too could leave it no slot
+# to ever run — a deadlock once enough conversions pile up.
+_SHIFT_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+_stft = None
+_istft = None
+_device = None
+_lock = threading.Lock()
+_failed = False
+
+
+def available() -> bool:
+    """True when the CUDA torchlibrosa pipeline can be used."""
+    return _ensure_modules()
+
+
+def _ensure_modules() -> bool:
+    global _stft, _istft, _device, _failed
+    if _stft is not None:
+        return True
+    if _failed:
+        return False
+    with _lock:
+        if _stft is not None:
+            return True
+        if _failed:
+            return False
+        try:
+            import torch
+            import torchlibrosa as tl
+
+            if not torch.cuda.is_available():
+                raise RuntimeError("CUDA not available")
+            _device = torch.device("cuda")
+            _stft = tl.STFT(n_fft=N_FFT, hop_length=HOP_LENGTH).to(_device).eval()
+            _istft = tl.ISTFT(n_fft=N_FFT, hop_length=HOP_LENGTH).to(_device).eval()
+            logger.info("torchlibrosa GPU pipeline ready")
+            return True
+        except Exception as e:
+            logger.info(f"GPU DSP pipeline unavailable, using librosa: {e}")
+            _failed = True
+            return False
+
+
+def set_loop(loop) -> None:
+    """Register the event loop that hosts the micro-batch worker."""
+    global _loop
+    _loop = loop
+
+
+def spectral_shift(audio, formant_shift: float = 1.0, tilt=None):
+    """Shift formants (and optionally tilt the spectrum) on the GPU.
+
+    The formant shift is an inverse-map gather over the frequency axis,
+    applied to real and imaginary parts alike so phase is preserved;
+    ``tilt`` is an optional per-bin gain vector. When called from a
+    worker thread with a registered loop, the call is routed through
+    the micro-batcher so concurrent requests share one FFT.
+    """
+    if _loop is not None and threading.current_thread() is not threading.main_thread():
+        return asyncio.run_coroutine_threadsafe(
+            _submit(audio, formant_shift, tilt), _loop
+        ).result()
+    return _shift_batch([(audio, formant_shift, tilt)])[0]
+
+
+async def _submit(audio, formant_shift, tilt):
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+        asyncio.ensure_future(_batch_worker())
+    future = asyncio.get_running_loop().create_future()
+    await _queue.put((audio, formant_shift, tilt, future))
+    return await future
+
+
+async def _batch_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _queue.get()]
+        deadline = loop.time() + MAX_WAIT
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        items = [(audio, shift, tilt) for audio, shift, tilt, _ in batch]
+        try:
+            results = await loop.run_in_executor(_SHIFT_EXECUTOR, _shift_batch, items)
+            for (_, _, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+def _shift_batch(items):
+    """Run one batched STFT/shift/iSTFT pass over a list of requests."""
+    import torch
+
+    lengths = [len(audio) for audio, _, _ in items]
+    padded = max(lengths)
+
+    with torch.no_grad():
+        x = torch.zeros(len(items), padded, device=_device)
+        for row, (audio, _, _) in enumerate(items):
+            x[row, : len(audio)] = torch.from_numpy(audio).float().to(_device)
+        real, imag = _stft(x)
+
+        num_bins = real.shape[-1]
+        bins = torch.arange(num_bins, device=_device)
+        for row, (_, formant_shift, tilt) in enumerate(items):
+            r, i = real[row], imag[row]
+            if formant_shift != 1.0:
+                src = (bins / formant_shift).long()
+                valid = src < num_bins
+                src = src.clamp(max=num_bins - 1)
+                r = torch.where(valid, r[..., src], torch.zeros_like(r))
+                i = torch.where(valid, i[..., src], torch.zeros_like(i))
+            if tilt is not None:
+                gain = torch.from_numpy(tilt).float().to(_device)
+                r = r * gain
+                i = i * gain
+            real[row], imag[row] = r, i
+
+        out = _istft(real, imag, length=padded)
+
+    return [out[row, : lengths[row]].cpu().numpy() for row in range(len(items))]
+
+
+def pitch_shift(audio, sr: int, n_steps: float):
+    """Pitch-shift via an explicit phase vocoder plus soxr resample.
+
+    librosa.effects.pitch_shift hides the same stretch-then-resample
+    pipeline but routes the resample through scipy's scalar polyphase
+    filter. Doing the phase-vocoder stretch directly and handing the
+    resample to soxr's SIMD kernels is several times faster and
+    audibly equivalent for speech. Falls back to librosa when soxr is
+    not installed.
+    """
+    import librosa
+
+    try:
+        import soxr
+    except ImportError:
+        return librosa.effects.pitch_shift(audio, sr=sr, n_steps=n_steps)
+
+    rate = 2.0 ** (-n_steps / 12.0)
+    stft = librosa.stft(audio, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    stretched = librosa.phase_vocoder(stft, rate=rate, hop_length=HOP_LENGTH)
+    shifted = librosa.istft(stretched, hop_length=HOP_LENGTH)
+    resampled = soxr.resample(shifted, sr / rate, sr)
+    return librosa.util.fix_length(resampled.astype(np.float32), size=len(audio))
@@ -0,0 +1,10 @@
+"""Shared store for uploaded privacy-audio metadata."""
+
+from .redis_store import RedisJSONStore
+
+_store = RedisJSONStore("privacy:audio:")
+
+put = _store.put
+get = _store.get
+delete = _store.delete
+list_all = _store.list_all
@@ -0,0 +1,47 @@
+"""Redis-backed JSON metadata stores shared across routers.
+
+Each store namespaces its keys with a prefix and holds JSON-encoded
+values with a TTL, so metadata survives worker restarts, is visible to
+every Uvicorn worker, and expires on its own instead of relying on
+per-process cleanup tasks.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+import redis.asyncio as redis
+
+_client = redis.from_url(
+    os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    decode_responses=True,
+)
+
+
+class RedisJSONStore:
+    def __init__(self, prefix: str):
+        self._prefix = prefix
+
+    def _key(self, item_id: str) -> str:
+        return f"{self._prefix}{item_id}"
+
+    async def put(self, item_id: str, meta: dict, ttl: int = 7200) -> None:
+        """Store metadata for an item, expiring after ``ttl`` seconds."""
+        await _client.set(self._key(item_id), json.dumps(meta), ex=ttl)
+
+    async def get(self, item_id: str) -> Optional[dict]:
+        """Return the metadata for an item, or None if unknown/expired."""
+        raw = await _client.get(self._key(item_id))
+        return json.loads(raw) if raw else None
+
+    async def delete(self, item_id: str) -> None:
+        await _client.delete(self._key(item_id))
+
+    async def list_all(self) -> Dict[str, dict]:
+        """Return metadata for all currently registered items."""
+        items: Dict[str, dict] = {}
+        async for key in _client.scan_iter(f"{self._prefix}*"):
+            raw = await _client.get(key)
+            if raw:
+                items[key[len(self._prefix):]] = json.loads(raw)
+        return items